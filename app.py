@@ -1,6 +1,8 @@
 import csv
 import io
-from datetime import datetime
+import sys
+import time
+from typing import NamedTuple
 
 import streamlit as st
 
@@ -12,60 +14,112 @@ st.title(APP_TITLE)
 # -----------------------------
 # Core evaluation logic (priority order)
 # -----------------------------
-def evaluate(checks: dict) -> tuple[str, str]:
+class Checks(NamedTuple):
+    a_source_provided: bool
+    a_target_provided: bool
+    a_output_provided: bool
+
+    b_source_face_clear: bool
+    b_source_no_distortions: bool
+
+    c_target_expression_readable: bool
+    c_target_pose_readable: bool
+    c_target_mouth_readable: bool
+
+    d_output_identity_preserved: bool
+    d_output_features_match: bool
+
+    e_expression_match: bool
+    e_pose_match: bool
+    e_mouth_match: bool
+
+    f_no_cutout_edges: bool
+    f_no_warping: bool
+    f_no_double_features: bool
+    f_sharpness_consistent: bool
+    f_lighting_consistent: bool
+
+    g_no_gender_body_mismatch: bool
+    g_skin_tone_matches: bool
+    g_no_weird_tint: bool
+    g_hairline_natural: bool
+    g_no_hair_overlap_weirdness: bool
+
+    h_no_disfigured_limbs: bool
+    h_no_extra_missing_limbs: bool
+    h_no_background_glitch: bool
+
+    @property
+    def mask(self) -> int:
+        return sum(bool(v) << i for i, v in enumerate(self))
+
+# Each check gets a fixed bit (its field index); a group passes only if all of its bits are set.
+BIT = {k: i for i, k in enumerate(Checks._fields)}
+
+def group_mask(*keys: str) -> int:
+    mask = 0
+    for k in keys:
+        mask |= 1 << BIT[k]
+    return mask
+
+# (group mask, fail reason) in priority order — the first incomplete group wins
+REASON_TABLE: list[tuple[int, str]] = [
     # A) Input completeness
-    if not (checks["a_source_provided"] and checks["a_target_provided"] and checks["a_output_provided"]):
-        return "FAIL", "missing required image(s)"
-
+    (group_mask("a_source_provided", "a_target_provided", "a_output_provided"),
+     "missing required image(s)"),
     # B) Source sanity
-    if not checks["b_source_face_clear"] or not checks["b_source_no_distortions"]:
-        return "FAIL", "source identity not clear enough"
-
+    (group_mask("b_source_face_clear", "b_source_no_distortions"),
+     "source identity not clear enough"),
     # C) Target anchor verifiable
-    if not checks["c_target_expression_readable"] or not checks["c_target_pose_readable"] or not checks["c_target_mouth_readable"]:
-        return "FAIL", "target expression/pose not verifiable"
-
+    (group_mask("c_target_expression_readable", "c_target_pose_readable", "c_target_mouth_readable"),
+     "target expression/pose not verifiable"),
     # D) Identity preservation
-    if not checks["d_output_identity_preserved"] or not checks["d_output_features_match"]:
-        return "FAIL", "identity not preserved"
-
+    (group_mask("d_output_identity_preserved", "d_output_features_match"),
+     "identity not preserved"),
     # E) Target match (critical)
-    if not checks["e_expression_match"]:
-        return "FAIL", "expression mismatch (Target → Output)"
-    if not checks["e_pose_match"]:
-        return "FAIL", "head pose mismatch (Target → Output)"
-    if not checks["e_mouth_match"]:
-        return "FAIL", "mouth position mismatch (Target → Output)"
-
+    (group_mask("e_expression_match"), "expression mismatch (Target → Output)"),
+    (group_mask("e_pose_match"), "head pose mismatch (Target → Output)"),
+    (group_mask("e_mouth_match"), "mouth position mismatch (Target → Output)"),
     # F) Photorealism & blend
-    f_ok = all([
-        checks["f_no_cutout_edges"],
-        checks["f_no_warping"],
-        checks["f_no_double_features"],
-        checks["f_sharpness_consistent"],
-        checks["f_lighting_consistent"],
-    ])
-    if not f_ok:
-        return "FAIL", "visible artifacts / unrealistic blending"
-
+    (group_mask("f_no_cutout_edges", "f_no_warping", "f_no_double_features",
+                "f_sharpness_consistent", "f_lighting_consistent"),
+     "visible artifacts / unrealistic blending"),
     # G) Consistency
-    if not checks["g_no_gender_body_mismatch"]:
-        return "FAIL", "gender/body inconsistency"
-    if not checks["g_skin_tone_matches"] or not checks["g_no_weird_tint"]:
-        return "FAIL", "skin tone/lighting inconsistency"
-    if not checks["g_hairline_natural"] or not checks["g_no_hair_overlap_weirdness"]:
-        return "FAIL", "unnatural hair blending"
-
+    (group_mask("g_no_gender_body_mismatch"), "gender/body inconsistency"),
+    (group_mask("g_skin_tone_matches", "g_no_weird_tint"), "skin tone/lighting inconsistency"),
+    (group_mask("g_hairline_natural", "g_no_hair_overlap_weirdness"), "unnatural hair blending"),
     # H) Anatomy & scene integrity
-    if not checks["h_no_disfigured_limbs"] or not checks["h_no_extra_missing_limbs"] or not checks["h_no_background_glitch"]:
-        return "FAIL", "anatomical artifact / logical inconsistency"
+    (group_mask("h_no_disfigured_limbs", "h_no_extra_missing_limbs", "h_no_background_glitch"),
+     "anatomical artifact / logical inconsistency"),
+]
+GROUP_MASKS: tuple[int, ...] = tuple(gm for gm, _ in REASON_TABLE)
+FAIL_REASONS: tuple[str, ...] = tuple(sys.intern(reason) for _, reason in REASON_TABLE)
+
+# Prebuilt evaluate() results, indexed by group
+_FAIL: tuple[tuple[str, str], ...] = tuple(("FAIL", r) for r in FAIL_REASONS)
+_PASS: tuple[str, str] = ("PASS", "")
+
+def fail_index(mask: int) -> int:
+    # Index of the first failing group in GROUP_MASKS, or -1 if all pass
+    for i, gm in enumerate(GROUP_MASKS):
+        if (mask & gm) != gm:
+            return i
+    return -1
+
+def evaluate_mask(mask: int) -> tuple[str, str]:
+    i = fail_index(mask)
+    return _PASS if i < 0 else _FAIL[i]
+
+def evaluate(checks: Checks) -> tuple[str, str]:
+    return evaluate_mask(checks.mask)
 
-    return "PASS", ""
+_PASS_LINE = "PASS — natural blend, Source identity preserved, Target expression/pose/mouth matched."
+_FAIL_PREFIX = {r: f"FAIL — Primary: {r}." for r in FAIL_REASONS}
 
 def verdict_line(result: str, primary_reason: str, notes: str) -> str:
     if result == "PASS":
-        return "PASS — natural blend, Source identity preserved, Target expression/pose/mouth matched."
-    base = f"FAIL — Primary: {primary_reason}."
+        return _PASS_LINE
+    base = _FAIL_PREFIX.get(primary_reason) or f"FAIL — Primary: {primary_reason}."
     notes = (notes or "").strip()
     if notes:
         base += f" Notes: {notes}"
@@ -76,6 +130,11 @@ def verdict_line(result: str, primary_reason: str, notes: str) -> str:
 # -----------------------------
 if "log_rows" not in st.session_state:
     st.session_state.log_rows = []
+# Bumped on every log mutation; the encoded CSV is rebuilt only when it changes
+if "log_version" not in st.session_state:
+    st.session_state.log_version = 0
+if "log_csv" not in st.session_state:
+    st.session_state.log_csv = (-1, b"")
 
 # Defaults: speed-first (most boxes True), inputs False
 DEFAULTS = {
@@ -113,6 +172,22 @@ DEFAULTS = {
     "h_no_extra_missing_limbs": True,
     "h_no_background_glitch": True,
 }
+# Checks mirrors DEFAULTS field-for-field; evaluation and logging depend on it
+assert tuple(DEFAULTS) == Checks._fields
+
+# Session log column order
+_SORTED_KEYS: tuple[str, ...] = tuple(sorted(DEFAULTS))
+HEADERS: tuple[str, ...] = (
+    "timestamp", "job_id", "reviewer", "result", "primary_fail_reason", "notes",
+    *_SORTED_KEYS,
+)
+
+def build_csv(rows: list[dict]) -> bytes:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(HEADERS)
+    writer.writerows([r[k] for k in HEADERS] for r in rows)
+    return output.getvalue().encode("utf-8")
 
 def ensure_defaults():
     for k, v in DEFAULTS.items():
@@ -202,7 +277,7 @@ with right:
 # -----------------------------
 # Compute result
 # -----------------------------
-checks = {k: bool(st.session_state[k]) for k in DEFAULTS.keys()}
+checks = Checks(*(bool(st.session_state[k]) for k in Checks._fields))
 result, primary_reason = evaluate(checks)
 line = verdict_line(result, primary_reason, notes)
 
@@ -226,36 +301,37 @@ c1, c2, c3 = st.columns([1, 1, 2])
 with c1:
     if st.button("Add to Session Log"):
         row = {
-            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
             "job_id": job_id.strip(),
             "reviewer": reviewer.strip(),
             "result": result,
             "primary_fail_reason": primary_reason,
             "notes": notes.strip(),
         }
-        for k in sorted(checks.keys()):
-            row[k] = checks[k]
+        values = checks._asdict()
+        for k in _SORTED_KEYS:
+            row[k] = values[k]
         st.session_state.log_rows.append(row)
+        st.session_state.log_version += 1
         st.toast("Added to log.", icon="✅")
 
 with c2:
     if st.button("Clear Session Log"):
         st.session_state.log_rows = []
+        st.session_state.log_version += 1
         st.toast("Cleared.", icon="🗑️")
 
 with c3:
     if st.session_state.log_rows:
-        # Build CSV
-        headers = list(st.session_state.log_rows[0].keys())
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=headers)
-        writer.writeheader()
-        for r in st.session_state.log_rows:
-            writer.writerow(r)
+        # Build CSV (reused across reruns until the log changes)
+        version, csv_bytes = st.session_state.log_csv
+        if version != st.session_state.log_version:
+            csv_bytes = build_csv(st.session_state.log_rows)
+            st.session_state.log_csv = (st.session_state.log_version, csv_bytes)
 
         st.download_button(
             "Download CSV (Session Log)",
-            data=output.getvalue().encode("utf-8"),
+            data=csv_bytes,
             file_name="faceswap_qa_session_log.csv",
             mime="text/csv",
         )